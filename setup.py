@@ -34,9 +34,10 @@ setup(
     },
     include_package_data=True,
     install_requires=requirements,
+    extras_require={"fast": ["orjson"]},
     test_suite="tests",
     tests_require=test_requirements,
-    python_requires=">=3.5",
+    python_requires=">=3.7",
     keywords="snapchat-dl",
     license="MIT license",
     packages=find_packages(include=["snapchat_dl", "snapchat_dl.*"]),
@@ -2,11 +2,20 @@
 # Top-level package for Snapchat Downloader.
 #======================================================================================================================
 
-from snapchat_dl.snapchat_dl import SnapchatDL
-
 __author__  = "Steve Hoek (based on work by Aakash Gajjar)"
 __email__   = "steve.hoek@gmail.com"
 __all__     = ["SnapchatDL"]
 
+#----------------------------------------------------------------------------------------------------------------------
+def __getattr__(name):
+    """
+    Import SnapchatDL on first access so the CLI can parse arguments (and print help) without loading requests.
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    if name == "SnapchatDL":
+        from snapchat_dl.snapchat_dl import SnapchatDL
+        return SnapchatDL
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 #======================================================================================================================
 #======================================================================================================================
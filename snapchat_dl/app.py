@@ -5,24 +5,58 @@
 import sys
 import time
 
-import pyperclip                                            # pyright: ignore[reportMissingModuleSource]
-
 from datetime                   import datetime
-from datetime                   import timedelta
-from dateutil                   import tz                   # pyright: ignore[reportMissingModuleSource]
 from timeit                     import default_timer as timer
 
 from loguru                     import logger               # pyright: ignore[reportMissingImports]
 
-from snapchat_dl.snapchat_dl    import SnapchatDL           # pyright: ignore[reportMissingImports]
 from snapchat_dl.cli            import parseArguments       # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils          import searchUsernames      # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils          import processRootFolder    # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils          import processBatchFile     # pyright: ignore[reportMissingImports]
-from snapchat_dl.utils          import UserNotFoundError    # pyright: ignore[reportMissingImports]
-from snapchat_dl.utils          import strftime             # pyright: ignore[reportMissingImports]
 
-historyUsernames = list()
+QUIETSCREENLEVELS   = frozenset({"DEBUG", "ERROR"})
+AUTOMATEDFILELEVELS = frozenset({"SUCCESS", "ERROR", "DEBUG"})
+
+historyUsernames = set()
+
+#----------------------------------------------------------------------------------------------------------------------
+def _quietScreenLogFilter(record):
+#----------------------------------------------------------------------------------------------------------------------
+    return record["level"].name in QUIETSCREENLEVELS
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def _automatedScreenLogFilter(record):
+#----------------------------------------------------------------------------------------------------------------------
+    return record["level"].name != "INFO"
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def _automatedFileLogFilter(record):
+#----------------------------------------------------------------------------------------------------------------------
+    return record["level"].name in AUTOMATEDFILELEVELS
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def _screenLogFilter(quiet:bool, automated:bool):
+    """
+    Pick the console log filter once, since the flags it depends on never change after startup.
+
+    Args:
+        quiet (bool): only errors (and debug output) reach the console
+        automated (bool): everything but INFO reaches the console
+
+    Returns:
+        function: filter for the console sink, or None to let every record through
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    if quiet is True:
+        return _quietScreenLogFilter
+    elif automated is True:
+        return _automatedScreenLogFilter
+    return None
+
 
 #----------------------------------------------------------------------------------------------------------------------
 def _downloadUsers(downloader, usernames: list, respectHistory=False, sleepInterval=1):
@@ -34,21 +68,16 @@ def _downloadUsers(downloader, usernames: list, respectHistory=False, sleepInter
         respectHistory (bool, optional): append username to history. Defaults to False.
     """
 #----------------------------------------------------------------------------------------------------------------------
-    for username in usernames:
-        time.sleep(sleepInterval)
-
-        if respectHistory is True:
-            if username not in historyUsernames:
-                historyUsernames.append(username)
-                try:
-                    downloader.DownloadSnaps(username)
-                except UserNotFoundError:
-                    return
-        else:
-            try:
-                downloader.DownloadSnaps(username)
-            except UserNotFoundError:
-                return
+    if respectHistory is True:
+        # filter before dispatching so the history is only touched from this thread
+        usernames = [username for username in usernames if username not in historyUsernames]
+        historyUsernames.update(usernames)
+
+    failed = downloader.DownloadSnapsMany(usernames, sleepInterval=sleepInterval)
+    if failed:
+        logger.opt(colors=True).error("<red>[⏹] Failed to download {} of {} users: <magenta>{}</magenta></red>\n", len(failed), len(usernames), ", ".join(sorted(failed)))
+        # let a failed user be picked up again the next time it shows up
+        historyUsernames.difference_update(failed)
 
 
 #----------------------------------------------------------------------------------------------------------------------
@@ -61,35 +90,22 @@ def main():
 
     args = parseArguments()
 
+    # deferred until the arguments are known to be valid so `--help` doesn't pay for them
+    from snapchat_dl.snapchat_dl    import SnapchatDL           # pyright: ignore[reportMissingImports]
+
     env = "LOCALLY"
     logColor = True
     if args.automated is True:
         logColor=False
         env = "AUTOMATED"
 
-    def logFilterScreen(record):
-        if args.quiet is True:
-            return (record["level"].name == "DEBUG") or (record["level"].name == "ERROR")    
-        elif args.automated is True:
-            return record["level"].name != "INFO"
-        else:
-            return True
-
-    def logFilterFile(record):
-        return (record["level"].name == "SUCCESS") or (record["level"].name == "ERROR") or (record["level"].name == "DEBUG")
-
     logger.remove()
-    logger.add(sys.stderr, filter=logFilterScreen, colorize=logColor, format="<bold>{message}</bold>")
+    logger.add(sys.stderr, filter=_screenLogFilter(args.quiet, args.automated), colorize=logColor, format="<bold>{message}</bold>")
     logger.add("SnapchatDL.log", rotation="daily", colorize=False, format="{message}")
     if args.automated is True:
-        logger.add("SnapchatDL-Automated.log", rotation="weekly", filter=logFilterFile, colorize=False, format="{message}")
-
-    dtUTC = datetime.now(tz.tzutc())
-    dtLocal = datetime.now(tz.tzlocal())
-    dtHome = datetime.now(tz.gettz('America/Detroit'))
-    offsetHome = dtHome.utcoffset() / timedelta(hours=1)
-    dtLocal = dtUTC + timedelta(hours=offsetHome)
-    timeStr = strftime(dtLocal.timestamp(), "%m-%d-%Y %H:%M")
+        logger.add("SnapchatDL-Automated.log", rotation="weekly", filter=_automatedFileLogFilter, colorize=False, format="{message}")
+
+    timeStr = datetime.now().astimezone().strftime("%m-%d-%Y %H:%M")
     msg = "\n" + \
           "------------------------------------------------------------------------------------\n" + \
           "<yellow>SnapchatDL 3.0.0</yellow> (running <green>{}</green> at <cyan>{}</cyan>)\n".format(env, timeStr) + \
@@ -100,7 +116,8 @@ def main():
         logger.opt(colors=True).info(msg)
 
     if args.scanRootFolder or args.batchFile:
-        usernames = processBatchFile(args) + processRootFolder(args)
+        # a username can appear in both sources; merge them once and sort for a stable download order
+        usernames = sorted(processBatchFile(args) | processRootFolder(args))
         if not usernames:
             return
     else:
@@ -121,16 +138,24 @@ def main():
         fast=args.fast,
     )
 
+    interrupted = False
     try:
         _downloadUsers(downloader, usernames)
 
         if args.scanClipboard is True:
+            import pyperclip                                # pyright: ignore[reportMissingModuleSource]
+
             logger.info("\nListening for valid Snapchat story links added to the clipboard")
 
+            lastClipboard = None
             while True:
-                clipboardUsernames = searchUsernames(pyperclip.paste())
-                if len(clipboardUsernames) > 0:
-                    _downloadUsers(downloader, clipboardUsernames, respectHistory=True)
+                # only scan the clipboard when its contents have changed since the last poll
+                clipboard = pyperclip.paste()
+                if clipboard != lastClipboard:
+                    lastClipboard = clipboard
+                    clipboardUsernames = searchUsernames(clipboard)
+                    if len(clipboardUsernames) > 0:
+                        _downloadUsers(downloader, clipboardUsernames, respectHistory=True)
 
                 time.sleep(1)
 
@@ -160,8 +185,12 @@ def main():
             logger.opt(colors=True).info(msg)
 
     except KeyboardInterrupt:
+        interrupted = True
         exit(0)
 
+    finally:
+        downloader.Close(cancelPending=interrupted)
+
 #----------------------------------------------------------------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -3,13 +3,15 @@
 #======================================================================================================================
 
 import argparse
+import functools
 import os
 import sys
 
 #----------------------------------------------------------------------------------------------------------------------
-def parseArguments():
+@functools.lru_cache(maxsize=None)
+def _buildParser():
     """
-    Command parser for Snapchat Downloader.
+    Build (once) the argument parser for Snapchat Downloader.
     """
 #----------------------------------------------------------------------------------------------------------------------
     parser = argparse.ArgumentParser(prog="snapchat-dl",
@@ -95,7 +97,7 @@ def parseArguments():
         "-d",
         "--dump-json",
         action="store_true",
-        help="Save snap metadata to a JSON file next to downloaded content.",
+        help="Save snap and profile metadata to JSON files next to downloaded content.",
         dest="dumpJSON",
     )
 
@@ -120,7 +122,7 @@ def parseArguments():
         "--max-workers",
         action="store",
         default=4,
-        help="Set maximum number of parallel downloads. (Default: 4)  NOTE: only applies when --no-multipart arg is present",
+        help="Set maximum number of parallel downloads, and of users processed at once. (Default: 4)",
         dest="maxWorkers",
         type=int,
     )
@@ -166,11 +168,30 @@ def parseArguments():
         help="Change logging style when run under automation (eg: Shortcuts).",
     )
 
+    return parser
+
+
+#----------------------------------------------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=None)
+def _parseArgv(argv:tuple):
+#----------------------------------------------------------------------------------------------------------------------
+    return _buildParser().parse_args(list(argv))
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def parseArguments():
+    """
+    Command parser for Snapchat Downloader.
+
+    The parsed arguments are cached per command line, so every caller shares the same Namespace and must treat it as
+    read-only.
+    """
+#----------------------------------------------------------------------------------------------------------------------
     if len(sys.argv) == 1:
-        parser.print_help()
+        _buildParser().print_help()
         sys.exit(1)
 
-    return parser.parse_args()
+    return _parseArgv(tuple(sys.argv[1:]))
 
 #======================================================================================================================
 #======================================================================================================================
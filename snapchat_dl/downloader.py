@@ -3,76 +3,167 @@
 #======================================================================================================================
 
 import os
+import stat
 import time
 import requests                                 # pyright: ignore[reportMissingModuleSource]
 
 from loguru                 import logger       # pyright: ignore[reportMissingImports]
+from requests.adapters      import HTTPAdapter  # pyright: ignore[reportMissingModuleSource]
+from urllib3.util.retry     import Retry        # pyright: ignore[reportMissingModuleSource]
 
 from snapchat_dl.utils      import strftrunc    # pyright: ignore[reportMissingImports]
 
+MINCHUNKSIZE    = 64 * 1024
+MAXCHUNKSIZE    = 1024 * 1024
+WRITEBUFFERSIZE = 1024 * 1024
+TIMEOUT         = (3.05, 27)        # (connect, read) seconds
+RETRYSTATUSES   = frozenset([429, 500, 502, 503, 504])
+
+#----------------------------------------------------------------------------------------------------------------------
+def createAdapter(maxWorkers:int=4, retries:int=3):
+    """
+    Create a pooled HTTP adapter that retries transient failures.
+
+    Args:
+        maxWorkers (int): number of threads expected to share the adapter
+        retries (int): attempts to make on connection failures and transient server errors before giving up
+
+    Returns:
+        requests.adapters.HTTPAdapter: adapter to mount on a session
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    # retry connection failures and transient server errors with exponential backoff; once retries run out the last
+    # response is returned (not raised) so the caller's status handling still applies
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=RETRYSTATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    return HTTPAdapter(pool_connections=maxWorkers, pool_maxsize=maxWorkers*2, max_retries=retry)
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def createSession(maxWorkers:int=4):
+    """
+    Create a requests session that keeps connections alive between downloads.
+
+    Args:
+        maxWorkers (int): number of threads expected to share the session
+
+    Returns:
+        requests.Session: session with a pooled, retrying adapter mounted
+    """
 #----------------------------------------------------------------------------------------------------------------------
-def DownloadUrl(url:str, pathname:str, sleepInterval:int=0, quiet:bool=False, automated:bool=False, skipSizeCheck:bool=False):
+    session = requests.Session()
+    adapter = createAdapter(maxWorkers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = createSession()
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def logSkipped(filename:str):
+    """
+    Log that an existing snap was left in place.
+
+    Args:
+        filename (str): name of the skipped file
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    logger.opt(colors=True).info("\t<black>{}</black>", strftrunc("Skipping existing snap " + filename, 70))
+
+
+#----------------------------------------------------------------------------------------------------------------------
+def DownloadUrl(url:str, pathname:str, sleepInterval:int=0, quiet:bool=False, automated:bool=False, skipSizeCheck:bool=False, session=None):
     """
     Download URL to destionation pathname.
 
     Args:
         url (str): url to download
-        pathname (str): absolute path to destination file
+        pathname (str): absolute path to destination file; its folder must already exist
         sleepInterval (int): duration of sleep for rate limiting
         quiet (bool): only output errors
         skipSizeCheck (bool): don't validate the size with the HTTP headers
+        session (requests.Session): session to download with (defaults to a shared module session)
 
     Returns:
         bool: true if something is downloaded, false if not (due to error or skip)
     """
 #----------------------------------------------------------------------------------------------------------------------
     filename = os.path.basename(pathname)
+    session = session or _SESSION
+
+    # stat the destination once; everything below works from these two values
+    try:
+        fileStat = os.stat(pathname)
+        exists = stat.S_ISREG(fileStat.st_mode)
+        existingSize = fileStat.st_size
+    except FileNotFoundError:
+        exists = False
+        existingSize = 0
 
     #logger.opt(colors=True).debug("<blue>{}</blue>".format(url))
 
-    if (os.path.isfile(pathname)):
+    if exists:
         if skipSizeCheck:
-            msg = "Skipping existing snap {}".format(filename)
-            msg = strftrunc(msg, 70)
-            msg = "\t<black>"+msg+"</black>"
-            logger.opt(colors=True).info(msg)
+            logSkipped(filename)
             return False
 
-    if len(os.path.dirname(pathname)) > 0:
-        os.makedirs(os.path.dirname(pathname), exist_ok=True)
+        # a HEAD request is enough to tell whether the existing file is complete
+        try:
+            head = session.head(url, timeout=TIMEOUT, allow_redirects=True)
+            if head.ok and existingSize == int(head.headers.get("content-length", -1)):
+                logSkipped(filename)
+                return False
+        except (requests.exceptions.RequestException, ValueError):
+            pass
 
-    try:
-        response = requests.get(url, stream=True, timeout=10)
-    except requests.exceptions.ConnectTimeout:
-        response = requests.get(url, stream=True, timeout=10)
+    response = session.get(url, stream=True, timeout=TIMEOUT)
 
-    try:
-        if response.status_code != requests.codes.ok:   #requests.codes.get("ok")
-            raise response.raise_for_status()
-    except requests.exceptions.HTTPError:
-        logger.opt(colors=True).error("<red>[⏹] HTTPError {}</red> for <blue>{}</blue>", requests.Response().status_code, url)
+    if not response.ok:
+        logger.opt(colors=True).error("<red>[⏹] HTTPError {}</red> for <blue>{}</blue>", response.status_code, url)
+        response.close()
         return False
 
     try:
         skipDownload = False
-        if (os.path.isfile(pathname)):
+        if exists:
             if "content-length" in response.headers:
-                if (not skipSizeCheck and os.path.getsize(pathname) == int(response.headers.get("content-length"))):
+                if (not skipSizeCheck and existingSize == int(response.headers.get("content-length"))):
                     skipDownload = True
         
         if not skipDownload:
             logger.opt(colors=True).info("\tDownloading new snap <blue>{}</blue>".format(filename))
-        
-            if (os.path.isfile(pathname)):
-                os.remove(pathname)
 
-            with open(pathname, "xb") as handle:
-                try:
-                    for data in response.iter_content(chunk_size=4194304):
-                        handle.write(data)
-                    handle.close()
-                except requests.exceptions.RequestException as e:
-                    logger.opt(colors=True).error("<red>[⏹] "+e.strerror+"/red")
+            # stream into a side file and only give it the real name once complete, so an interrupted
+            # download never leaves a truncated snap behind for the next run to skip
+            temporary = f"{pathname}.part"
+
+            # size the read chunks to the snap: small images in one read, large videos in bigger chunks
+            contentLength = int(response.headers.get("content-length", 0))
+            handle = open(temporary, "wb", buffering=WRITEBUFFERSIZE)
+            try:
+                with handle:
+                    if 0 < contentLength < MINCHUNKSIZE:
+                        handle.write(response.content)
+                    else:
+                        chunkSize = max(MINCHUNKSIZE, min(contentLength // 16, MAXCHUNKSIZE))
+                        for data in response.iter_content(chunk_size=chunkSize):
+                            handle.write(data)
+            except requests.exceptions.RequestException as e:
+                os.remove(temporary)
+                logger.opt(colors=True).error("<red>[⏹] {}</red> for <blue>{}</blue>", e, url)
+                return False
+            except BaseException:
+                os.remove(temporary)
+                raise
+
+            os.replace(temporary, pathname)
 
             #Rate limiting
             time.sleep(sleepInterval)
@@ -82,10 +173,9 @@ def DownloadUrl(url:str, pathname:str, sleepInterval:int=0, quiet:bool=False, au
             raise FileExistsError
             
     except FileExistsError:
-        msg = "Skipping existing snap {}".format(filename)
-        msg = strftrunc(msg, 70)
-        msg = "\t<black>"+msg+"</black>"
-        logger.opt(colors=True).info(msg)
+        # hand the unread connection back to the session's pool right away
+        response.close()
+        logSkipped(filename)
         return False
 
 #======================================================================================================================
@@ -7,7 +7,11 @@ import re
 import json
 import subprocess
 import shlex
+import shutil
 import concurrent.futures
+import threading
+import functools
+import random
 import requests                                             # pyright: ignore[reportMissingModuleSource]
 import time
 
@@ -20,13 +24,33 @@ from loguru                 import logger                   # pyright: ignore[re
 from pathlib                import Path
 
 from snapchat_dl.downloader import DownloadUrl              # pyright: ignore[reportMissingImports]
+from snapchat_dl.downloader import createAdapter            # pyright: ignore[reportMissingImports]
+from snapchat_dl.downloader import createSession            # pyright: ignore[reportMissingImports]
+from snapchat_dl.downloader import RETRYSTATUSES            # pyright: ignore[reportMissingImports]
+from snapchat_dl.downloader import logSkipped               # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils      import dumpResponse             # pyright: ignore[reportMissingImports]
+from snapchat_dl.utils      import loadJSON                 # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils      import strftime                 # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils      import strftrunc                # pyright: ignore[reportMissingImports]
 from snapchat_dl.utils      import UserNotFoundError        # pyright: ignore[reportMissingImports]
 
 MEDIATYPES      = ["jpg", "mp4"]
 MAXRETRYCOUNT   = 5
+APIENDPOINT     = "https://www.snapchat.com/add/{}/"
+APICHUNKSIZE    = 64 * 1024
+APISTARTTAG     = b'id="__NEXT_DATA__"'
+APIENDTAG       = b"</script>"
+APIREGEX        = re.compile(r'<script\s*id="__NEXT_DATA__"\s*type="application\/json">([^<]+)<\/script>')
+
+#----------------------------------------------------------------------------------------------------------------------
+@functools.lru_cache(maxsize=4096)
+def _dateFolderFor(day:int):
+    """
+    Format a day number (days since the epoch) as a date folder name; snaps mostly share a handful of days.
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    return strftime(day * 86400, "%Y-%m-%d")
+
 
 #----------------------------------------------------------------------------------------------------------------------
 class SnapchatDL:
@@ -65,12 +89,66 @@ class SnapchatDL:
         self.skipSpotlight = skipSpotlight
         self.fast = fast
 
-        self.apiEndpoint = "https://www.snapchat.com/add/{}/"
-        self.apiRegEx = (
-            r'<script\s*id="__NEXT_DATA__"\s*type="application\/json">([^<]+)<\/script>'
-        )
+        self._ffmpeg = shutil.which("ffmpeg") or "/opt/homebrew/bin/ffmpeg"
+
+        # ffmpeg does the work in a child process, so a few threads are enough to keep several merges running
+        self._mergeExecutor = concurrent.futures.ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, 4))
+        self._pendingMerges = set()
+
+        # set on Ctrl-C; user workers check it before every download and merge so they wind down before Close()
+        self._cancelled = threading.Event()
+
+        self._tzUTC = tz.tzutc()
+        self._tzHome = tz.gettz('America/Detroit')
+
+        # one pooled session for API lookups and media downloads so connections are reused across users and snaps.
+        # DownloadSnapsMany runs up to maxWorkers users at once, each with its own maxWorkers download threads, so size
+        # the pool for all of them or urllib3 discards the connections it can't keep
+        self.session = createSession(self.maxWorkers * (self.maxWorkers + 1))
+        self.session.headers.update({
+            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+        })
+
+        # the profile lookup gets more patient retries than media; requests picks the adapter with the longest matching
+        # prefix, so snap and avatar downloads keep the session's default policy
+        self.apiEndpoint = APIENDPOINT
+        self.session.mount(APIENDPOINT.split("{}")[0], createAdapter(self.maxWorkers, retries=MAXRETRYCOUNT))
 
         
+    #----------------------------------------------------------------------------------------------------------------------
+    def Close(self, cancelPending:bool=False):
+        """
+        Wait for pending multipart merges and release the pooled HTTP connections.
+
+        Args:
+            cancelPending (bool): drop merges that haven't started yet instead of waiting for them (e.g. after Ctrl-C)
+
+        Returns:
+            (none)
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        if cancelPending:
+            for future in list(self._pendingMerges):
+                future.cancel()
+        self._mergeExecutor.shutdown(wait=True)
+        self.session.close()
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _submitMerge(self, *args):
+        """
+        Queue a multipart merge, tracking it until it finishes so Close() can cancel it.
+
+        Returns:
+            (concurrent.futures.Future): the queued merge
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        future = self._mergeExecutor.submit(self._mergeMulti, *args)
+        self._pendingMerges.add(future)
+        future.add_done_callback(self._pendingMerges.discard)
+        return future
+
+
     #----------------------------------------------------------------------------------------------------------------------
     def _apiRequestResponse(self, username:str):
         """
@@ -80,54 +158,54 @@ class SnapchatDL:
             username (str): Snapchat `username`
 
         Returns:
-            (str): response
+            (str, int): response, cut off after the script tag holding the JSON payload, and its HTTP status code
         """
     #----------------------------------------------------------------------------------------------------------------------
         url = self.apiEndpoint.format(username)
-        return requests.get(
-            url,
-            headers={
-                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
-            },
-        ).text
+
+        # stream the page and stop reading once the payload's closing tag has arrived; the rest of the HTML is never used
+        with self.session.get(url, timeout=10, stream=True) as response:
+            buffer = bytearray()
+            start = -1
+            for chunk in response.iter_content(chunk_size=APICHUNKSIZE):
+                searchFrom = max(0, len(buffer) - len(APIENDTAG))
+                buffer.extend(chunk)
+                if start < 0:
+                    start = buffer.find(APISTARTTAG, max(0, searchFrom - len(APISTARTTAG)))
+                if start >= 0 and buffer.find(APIENDTAG, max(start, searchFrom)) >= 0:
+                    break
+            return buffer.decode(response.encoding or "utf-8", errors="replace"), response.status_code
 
 
     #----------------------------------------------------------------------------------------------------------------------
-    def _parseUserProfile(self, content:dict, username:str):
+    def _parseUserProfile(self, pageProps:dict, username:str):
     #----------------------------------------------------------------------------------------------------------------------
-        if "userProfile" in content["props"]["pageProps"]:
-            userProfile = content["props"]["pageProps"]["userProfile"]
-            id = userProfile["$case"]
-            return userProfile[id]
-        else:
+        userProfile = pageProps.get("userProfile")
+        if userProfile is None:
             raise UserNotFoundError
+        id = userProfile["$case"]
+        return userProfile[id]
 
 
     #----------------------------------------------------------------------------------------------------------------------
-    def _parsePublicStories(self, content: dict):
+    def _parsePublicStories(self, pageProps:dict):
     #----------------------------------------------------------------------------------------------------------------------
-        publicStories = content["props"]["pageProps"].get("story")
+        publicStories = pageProps.get("story")
         if isinstance(publicStories, dict) and "snapList" in publicStories:
             return publicStories["snapList"]
         return []
 
 
     #----------------------------------------------------------------------------------------------------------------------
-    def _parseCuratedHighlights(self, content: dict):
+    def _parseCuratedHighlights(self, pageProps:dict):
     #----------------------------------------------------------------------------------------------------------------------
-        if "curatedHighlights" in content["props"]["pageProps"]:
-            curatedHighlights = content["props"]["pageProps"]["curatedHighlights"]
-            return curatedHighlights
-        return []
+        return pageProps.get("curatedHighlights", [])
 
 
     #----------------------------------------------------------------------------------------------------------------------
-    def _parseSpotlightHighlights(self, content: dict):
+    def _parseSpotlightHighlights(self, pageProps:dict):
     #----------------------------------------------------------------------------------------------------------------------
-        if "spotlightHighlights" in content["props"]["pageProps"]:
-            spotlightHighlights = content["props"]["pageProps"]["spotlightHighlights"]
-            return spotlightHighlights
-        return []
+        return pageProps.get("spotlightHighlights", [])
 
 
     #----------------------------------------------------------------------------------------------------------------------
@@ -139,51 +217,55 @@ class SnapchatDL:
             username (str): Snapchat `username`
 
         Returns:
-            (dict, dict, dict, dict, dict): content, userProfile, publicStories, curatedHighlights, spotlightHighlights
+            (str, tuple): status and result; status is "ok" with (content, userProfile, publicStories, curatedHighlights,
+                spotlightHighlights) as the result, "notfound", "failed" or "transient" with None as the result
         """
     #----------------------------------------------------------------------------------------------------------------------
+        statusCode = None
         try:
-            response = self._apiRequestResponse(username)
-            if not response:
-                logger.opt(colors=True).error("<red>[⏹] Empty response when calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, requests.Response().status_code)
-                return [None, None, None, None, None]
+            response, statusCode = self._apiRequestResponse(username)
+            if statusCode in RETRYSTATUSES:
+                # the session already retried this with backoff; asking again won't help
+                logger.opt(colors=True).error("<red>[⏹] HTTPError calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+                return "failed", None
 
-            userFolder = os.path.join(self.rootFolder, username)
-            dumpResponse(response, os.path.join(userFolder, username+"_response.json"))
+            if not response:
+                logger.opt(colors=True).error("<red>[⏹] Empty response when calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+                return "transient", None
 
-            responseRawJSON = re.findall(self.apiRegEx, response)
-            if not responseRawJSON:
+            # cheap substring test first; the regex only runs on pages that actually carry the payload
+            responseMatch = APIREGEX.search(response) if "__NEXT_DATA__" in response else None
+            if not responseMatch:
                 #logger.debug(response)
-                logger.opt(colors=True).error("<red>[⏹] Unable to parse raw response from Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, requests.Response().status_code)
-                return [None, None, None, None, None]
+                logger.opt(colors=True).error("<red>[⏹] Unable to parse raw response from Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+                return "transient", None
 
-            dumpResponse(responseRawJSON, os.path.join(userFolder, username+"_raw.json"))
+            responseRawJSON = responseMatch.group(1)
+            content = loadJSON(responseRawJSON)
 
-            if responseRawJSON[0]:
-                content = json.loads(responseRawJSON[0])
-            else:
-                #logger.debug(responseRawJSON)
-                logger.opt(colors=True).error("<red>[⏹] Unable to index parsed response from Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, requests.Response().status_code)
-                return [None, None, None, None, None]
-
-            userProfile = self._parseUserProfile(content, username)
-            publicStories = self._parsePublicStories(content)
-            curatedHighlights = self._parseCuratedHighlights(content)
-            spotlightHighlights = self._parseSpotlightHighlights(content)
+            pageProps = content["props"]["pageProps"]
+            userProfile = self._parseUserProfile(pageProps, username)
+            publicStories = self._parsePublicStories(pageProps)
+            curatedHighlights = self._parseCuratedHighlights(pageProps)
+            spotlightHighlights = self._parseSpotlightHighlights(pageProps)
 
-            return content, userProfile, publicStories, curatedHighlights, spotlightHighlights
+            return "ok", (content, userProfile, publicStories, curatedHighlights, spotlightHighlights)
 
         except requests.exceptions.ConnectTimeout:
-            logger.opt(colors=True).error("<red>[⏹] Connection timeout calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, requests.Response().status_code)
-            return [None, None, None, None, None]
+            logger.opt(colors=True).error("<red>[⏹] Connection timeout calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+            return "failed", None
+
+        except requests.exceptions.RequestException:
+            logger.opt(colors=True).error("<red>[⏹] Connection error calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+            return "failed", None
 
         except UserNotFoundError:
-            logger.opt(colors=True).error("<red>[⏹] <magenta>{}</magenta> is not a valid user [Code: {}]</red>\n".format(username, requests.Response().status_code))
-            return ['nouser', None, None, None, None]
+            logger.opt(colors=True).error("<red>[⏹] <magenta>{}</magenta> is not a valid user [Code: {}]</red>\n".format(username, statusCode))
+            return "notfound", None
 
         except (IndexError, KeyError, ValueError):
-            logger.opt(colors=True).error("<red>[⏹] Exception calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, requests.Response().status_code)
-            return [None, None, None, None, None]
+            logger.opt(colors=True).error("<red>[⏹] Exception calling Snapchat API for user <magenta>{}</magenta> [Code: {}]</red>", username, statusCode)
+            return "transient", None
 
 
     #----------------------------------------------------------------------------------------------------------------------
@@ -209,7 +291,27 @@ class SnapchatDL:
 
 
     #----------------------------------------------------------------------------------------------------------------------
-    def _mergeMulti(self, folder:str, username:str, timestamp:int, filelist:str, count:int):
+    def _toLocalDate(self, timestampUTC:int, offsetHome:timedelta):
+        """
+        Convert a snap's UTC timestamp to the 'home' timestamp used for file and folder names.
+
+        Args:
+            timestampUTC (int): Snapchat `timestampInSec`
+            offsetHome (timedelta): current UTC offset of the home timezone
+
+        Returns:
+            (float, str): timestampLocal, dateFolder
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        dtLocal = datetime.fromtimestamp(timestampUTC, self._tzUTC) + offsetHome
+        if dtLocal.dst() == timedelta(0):
+            dtLocal = dtLocal + timedelta(hours=1)
+        timestampLocal = dtLocal.timestamp()
+        return timestampLocal, _dateFolderFor(int(timestampLocal // 86400))
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _mergeMulti(self, folder:str, username:str, timestamp:int, inputs:list, count:int):
         """
         Combine multipart story segments.
 
@@ -217,32 +319,33 @@ class SnapchatDL:
             self (object): this
             username (str): Snapchat `username`
             timestamp (int): Snapchat story 'timestamp'
-            filelist (string): story segments (ffmpeg style)
+            inputs (list): pathnames of the story segments
             count (int): number of story segments
 
         Returns:
             (none)
         """
     #----------------------------------------------------------------------------------------------------------------------
-        if count > 1:
+        if count > 1 and not self._cancelled.is_set():
             multipartFilename = strftime(timestamp, "%Y-%m-%d_%H-%M-%S_{}.mp4").format(username)
             multipartPathname = os.path.join(folder, multipartFilename)
 
-            command = "/opt/homebrew/bin/ffmpeg"
-            command += filelist
-            command += " -y -loglevel quiet -filter_complex \"concat=n={}\" ".format(count)
-#            command += " -y -loglevel quiet -filter_complex \"concat=n={}:v=1:a=1[outv][outa]\"".format(count)
-#            command += " -map \"[outv]\""
-#            command += " -map \"[outa]\" "
-            command += "\""
-            command += multipartPathname
-            command += "\""
+            argv = [self._ffmpeg]
+            for pathname in inputs:
+                argv += ["-i", pathname]
+            argv += ["-y", "-loglevel", "quiet", "-filter_complex", "concat=n={}".format(count)]
+#            argv += ["-y", "-loglevel", "quiet", "-filter_complex", "concat=n={}:v=1:a=1[outv][outa]".format(count)]
+#            argv += ["-map", "[outv]"]
+#            argv += ["-map", "[outa]"]
+            argv += [multipartPathname]
+
+            # shell form of the same command, for logging and generated scripts
+            command = " ".join(shlex.quote(arg) for arg in argv)
 
             if not os.path.isfile(multipartPathname):
-                logger.opt(colors=True).info("\tCombining multipart story:\n\t\t<blue>{}</blue>".format(command))
+                logger.opt(colors=True).info("\tCombining multipart story:\n\t\t<blue>{}</blue>", command)
 
-                execCommand = shlex.split(command)
-                subprocess.run(execCommand)
+                subprocess.run(argv, check=True)
             else:
                 msg = "Skipping existing multipart story {}".format(multipartFilename)
                 msg = strftrunc(msg, 70)
@@ -286,6 +389,117 @@ class SnapchatDL:
         subprocess.run(exec)
 
 
+    #----------------------------------------------------------------------------------------------------------------------
+    def _snapExists(self, pathname:str, existingFiles:dict):
+        """
+        Check whether a snap is already on disk, listing each folder only once.
+
+        Args:
+            pathname (str): absolute path of the snap
+            existingFiles (dict): folder listings gathered so far (folder -> set of filenames)
+
+        Returns:
+            (bool): True if the file exists
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        folder, filename = os.path.split(pathname)
+        if folder not in existingFiles:
+            existingFiles[folder] = set(os.listdir(folder)) if os.path.isdir(folder) else set()
+        return filename in existingFiles[folder]
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _downloadSnap(self, mediaURL:str, pathname:str):
+        """
+        Download a snap with this instance's settings, unless the run has been cancelled.
+
+        Args:
+            mediaURL (str): url of the snap
+            pathname (str): absolute path of the snap
+
+        Returns:
+            (bool): True if the snap was downloaded
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        if self._cancelled.is_set():
+            return False
+        return DownloadUrl(mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast, self.session)
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _awaitDownloads(self, futures:list):
+        """
+        Wait for queued downloads to finish.
+
+        Args:
+            futures (list): futures returned by submitting _downloadSnap to an executor
+
+        Returns:
+            (int): number of snaps that were actually downloaded
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        downloadCount = 0
+        for future in concurrent.futures.as_completed(futures):
+            if future.exception() is not None:
+                logger.opt(colors=True).error("<red>[⏹] Download failed: {}</red>", future.exception())
+            elif future.result():
+                downloadCount += 1
+        return downloadCount
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _dumpSnapJSON(self, snap:dict, userProfile:dict, pathname:str, kind:str):
+        """
+        Write a snap's metadata, together with its user's profile, next to the downloaded snap.
+
+        Args:
+            snap (dict): Snapchat snap
+            userProfile (dict): Snapchat userProfile
+            pathname (str): absolute path of the JSON file
+            kind (str): kind of snap, for the log message
+
+        Returns:
+            (none)
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        logger.opt(colors=True).info("\tDumping {} JSON:\n\t\t<blue>{}</blue>".format(kind, os.path.basename(pathname)))
+        # a single shallow copy carrying the extra key; the snap itself is left untouched
+        dumpResponse(dict(snap, snapUser=userProfile), pathname)
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _groupPublicStories(self, publicStories:dict, offsetHome:timedelta):
+        """
+        Split public stories into groups, where consecutive video segments sharing a timestamp make up one multipart
+        story and everything else stands alone. Stories without a media URL are dropped.
+
+        Args:
+            publicStories (dict): Snapchat stories
+            offsetHome (timedelta): UTC offset of the home timezone
+
+        Returns:
+            (list): (timestampLocal, dateFolder, [(story, mediaURL, mediaType), ...]) per group, in story order
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        groups = []
+        lastTimestamp = None
+        for story in publicStories:
+            mediaURL = story["snapUrls"]["mediaUrl"]
+            if len(mediaURL) == 0:
+                continue
+            mediaType = story["snapMediaType"]
+            timestampUTC = int(story["timestampInSec"]["value"])
+
+            timestampLocal, dateFolder = self._toLocalDate(timestampUTC, offsetHome)
+
+            if (timestampLocal == lastTimestamp) and (mediaType == 1):
+                groups[-1][2].append((story, mediaURL, mediaType))
+            else:
+                groups.append((timestampLocal, dateFolder, [(story, mediaURL, mediaType)]))
+            lastTimestamp = timestampLocal
+        return groups
+
+
     #----------------------------------------------------------------------------------------------------------------------
     def _downloadPublicStories(self, userProfile:dict, publicStories:dict):
         """
@@ -304,87 +518,64 @@ class SnapchatDL:
 
         logger.opt(colors=True).info("\n[+] <magenta>{}</magenta> has {} public stories".format(username, len(publicStories)))
 
+        categoryFolder = os.path.join(self.rootFolder, username, "Public Stories")
+
+        offsetHome = datetime.now(self._tzHome).utcoffset()
+
+        mergeFutures = []
+        downloadFutures = []
+        existingFiles = {}
+        createdFolders = set()
         executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maxWorkers)
-        try:
-            lastTimestamp = 0
-            multipartStoryCount = 1
-            multipartFileList = ""
-            downloadCount = 0
-
-            for story in publicStories:
-                id = story["snapId"]["value"]
-                mediaURL = story["snapUrls"]["mediaUrl"]
-                if len(mediaURL) == 0:
-                    continue
-                mediaType = story["snapMediaType"]
-                timestampUTC = int(story["timestampInSec"]["value"])
-
-                dtUTC = datetime.fromtimestamp(timestampUTC, tz.tzutc())
-                tzLocal = tz.tzlocal()
-                tzHome = tz.gettz('America/Detroit')
-                dtLocal = datetime.now(tzLocal)
-                dtHome = datetime.now(tzHome)
-                offsetLocal = dtLocal.utcoffset() / timedelta(hours=1)
-                offsetHome = dtHome.utcoffset() / timedelta(hours=1)
-                dtLocal = dtUTC + timedelta(hours=offsetLocal)
-                dtLocal = dtUTC + timedelta(hours=offsetHome)
-                if dtLocal.dst() == timedelta(0):
-                    dtLocal = dtLocal + timedelta(hours=1)
-                timestampHome = dtHome.timestamp()
-                timestampLocal = dtLocal.timestamp()
-                dateFolder = strftime(timestampLocal, "%Y-%m-%d")
-
-                dirname = os.path.join(self.rootFolder, username, "Public Stories", dateFolder)
+        downloadCount = 0
+
+        # queue every group's downloads up front so the pool stays busy, and only then wait on the multipart
+        # groups one at a time to hand them to the merge executor
+        multipartGroups = []
+        for timestampLocal, dateFolder, snaps in self._groupPublicStories(publicStories, offsetHome):
+            dirname = os.path.join(categoryFolder, dateFolder)
+            if dirname not in createdFolders:
                 os.makedirs(dirname, exist_ok=True)
+                createdFolders.add(dirname)
 
-                if (timestampLocal == lastTimestamp) and (mediaType == 1):
-                    multipartStoryCount += 1
-                else:
-                    if not self.noMultipart:
-                        multipartDateFolder = strftime(lastTimestamp, "%Y-%m-%d")
-                        multipartFolder = os.path.join(self.rootFolder, username, "Public Stories", multipartDateFolder)
-                        self._mergeMulti(multipartFolder, username, lastTimestamp, multipartFileList, multipartStoryCount)
-
-                    multipartStoryCount = 1
-                    multipartFileList = ""
+            # every snap in a group shares the timestamp, so format it once
+            timeStamp = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S")
 
+            multipartInputs = []
+            groupFutures = []
+            for multipartStoryCount, (story, mediaURL, mediaType) in enumerate(snaps, 1):
                 if mediaType == 0:
-                    filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}.{}").format(
-                        username, MEDIATYPES[mediaType]
-                    )
+                    filename = f"{timeStamp}_{username}.{MEDIATYPES[mediaType]}"
                 else:
-                    filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}_part-{}.{}").format(
-                        username, multipartStoryCount, MEDIATYPES[mediaType]
-                    )
-                    
-                multipartFileList += " -i "
-                multipartFileList += "\"" 
-                multipartFileList += os.path.join(dirname, filename)
-                multipartFileList += "\"" 
+                    filename = f"{timeStamp}_{username}_part-{multipartStoryCount}.{MEDIATYPES[mediaType]}"
 
-                lastTimestamp = timestampLocal
+                multipartInputs.append(os.path.join(dirname, filename))
 
                 if self.dumpJSON:
-                    filename = os.path.join(dirname, Path(filename).stem + ".json")
-                    mediaJSON = dict(story)
-                    mediaJSON["snapUser"] = userProfile
-                    logger.opt(colors=True).info("\tDumping story JSON:\n\t\t<blue>{}</blue>".format(os.path.basename(filename)))
-                    dumpResponse(mediaJSON, filename)
+                    self._dumpSnapJSON(story, userProfile, os.path.join(dirname, Path(filename).stem + ".json"), "story")
 
                 pathname = os.path.join(dirname, filename)
-                if self.noMultipart:
-                    executor.submit(DownloadUrl, mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast)
+                if self.fast and self._snapExists(pathname, existingFiles):
+                    logSkipped(os.path.basename(pathname))
                 else:
-                    if DownloadUrl(mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast):
-                        downloadCount += 1
+                    groupFutures.append(executor.submit(self._downloadSnap, mediaURL, pathname))
+
+            if len(snaps) > 1 and not self.noMultipart:
+                multipartGroups.append((dirname, timestampLocal, multipartInputs, groupFutures))
+            else:
+                downloadFutures.extend(groupFutures)
 
-            if not self.noMultipart:
-                multipartDateFolder = strftime(lastTimestamp, "%Y-%m-%d")
-                multipartFolder = os.path.join(self.rootFolder, username, "Public Stories", multipartDateFolder)
-                self._mergeMulti(multipartFolder, username, lastTimestamp, multipartFileList, multipartStoryCount)
+        # all segments of a group must be on disk before it can be merged
+        for dirname, timestampLocal, multipartInputs, groupFutures in multipartGroups:
+            downloadCount += self._awaitDownloads(groupFutures)
+            mergeFutures.append(self._submitMerge(dirname, username, timestampLocal, multipartInputs, len(multipartInputs)))
 
-        except KeyboardInterrupt:
-            executor.shutdown(wait=False)
+        downloadCount += self._awaitDownloads(downloadFutures)
+        executor.shutdown()
+
+        for future in concurrent.futures.as_completed(mergeFutures):
+            if future.exception() is not None:
+                logger.opt(colors=True).error("<red>[⏹] Multipart merge failed: {}</red>", future.exception())
 
         snapCount = len(publicStories)
         msg = "{} public stories downloaded ({}) or existing ({}) for <magenta>{}</magenta>".format(snapCount, downloadCount, snapCount-downloadCount, username)
@@ -416,71 +607,65 @@ class SnapchatDL:
         
         logger.opt(colors=True).info("\n[+] <magenta>{}</magenta> has {} curated highlights".format(username, len(curatedHighlights)))
 
+        categoryFolder = os.path.join(self.rootFolder, username, "Curated Highlights")
+
+        offsetHome = datetime.now(self._tzHome).utcoffset()
+
+        downloadFutures = []
+        existingFiles = {}
+        createdFolders = set()
         executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maxWorkers)
-        try:
-             total = 0
-             group = 0
-             downloadCount = 0
-             for highlight in curatedHighlights:
-                #logger.debug(json.dumps(highlight, indent=4))
-                groupTitle = highlight["storyTitle"]["value"]
+        total = 0
+        group = 0
+        downloadCount = 0
+        for highlight in curatedHighlights:
+            #logger.debug(json.dumps(highlight, indent=4))
+            groupTitle = highlight["storyTitle"]["value"]
+            if len(groupTitle) == 0:
+                groupTitle = highlight["highlightId"]["value"]
                 if len(groupTitle) == 0:
-                    groupTitle = highlight["highlightId"]["value"]
-                    if len(groupTitle) == 0:
-                        group += 1
-                        groupTitle = "Highlight-{}".format(group)
-                
-                snapCount = 0
-                snaps = highlight["snapList"]
-                for snap in snaps:
-                    #logger.debug(json.dumps(snap, indent=4))
-                    #id = snap["snapId"]["value"]
-                    mediaURL = snap["snapUrls"]["mediaUrl"]
-                    if len(mediaURL) == 0:
-                        continue
-                    mediaType = snap["snapMediaType"]
-                    timestampUTC = int(snap["timestampInSec"]["value"])
-
-                    dtUTC = datetime.fromtimestamp(timestampUTC, tz.tzutc())
-                    tzLocal = tz.tzlocal()
-                    tzHome = tz.gettz('America/Detroit')
-                    dtLocal = datetime.now(tzLocal)
-                    dtHome = datetime.now(tzHome)
-                    offsetLocal = dtLocal.utcoffset() / timedelta(hours=1)
-                    offsetHome = dtHome.utcoffset() / timedelta(hours=1)
-                    dtLocal = dtUTC + timedelta(hours=offsetLocal)
-                    dtLocal = dtUTC + timedelta(hours=offsetHome)
-                    if dtLocal.dst() == timedelta(0):
-                        dtLocal = dtLocal + timedelta(hours=1)
-                    timestampHome = dtHome.timestamp()
-                    timestampLocal = dtLocal.timestamp()
-                    dateFolder = strftime(timestampLocal, "%Y-%m-%d")
-
-                    dirname = os.path.join(self.rootFolder, username, "Curated Highlights", groupTitle)
+                    group += 1
+                    groupTitle = "Highlight-{}".format(group)
+
+            dirname = os.path.join(categoryFolder, groupTitle)
+
+            snapCount = 0
+            snaps = highlight["snapList"]
+            for snap in snaps:
+                #logger.debug(json.dumps(snap, indent=4))
+                #id = snap["snapId"]["value"]
+                mediaURL = snap["snapUrls"]["mediaUrl"]
+                if len(mediaURL) == 0:
+                    continue
+                mediaType = snap["snapMediaType"]
+                timestampUTC = int(snap["timestampInSec"]["value"])
+
+                timestampLocal, _ = self._toLocalDate(timestampUTC, offsetHome)
+
+                if dirname not in createdFolders:
                     os.makedirs(dirname, exist_ok=True)
+                    createdFolders.add(dirname)
 
-                    snapCount += 1
-                    filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}_curated_snap-{}.{}").format(
-                        username, snapCount, MEDIATYPES[mediaType]
-                    )
-
-                    if self.dumpJSON:
-                        filename = os.path.join(dirname, Path(filename).stem + ".json")
-                        mediaJSON = dict(snap)
-                        mediaJSON["snapUser"] = userProfile
-                        logger.opt(colors=True).info("\tDumping curated highlight JSON:\n\t\t<blue>{}</blue>".format(os.path.basename(filename)))
-                        dumpResponse(mediaJSON, filename)
-
-                    pathname = os.path.join(dirname, filename)
-                    if self.noMultipart:
-                        executor.submit(DownloadUrl, mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast)
-                    else:
-                        if DownloadUrl(mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast):
-                            downloadCount += 1
-                    total += 1
+                snapCount += 1
+                filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}_curated_snap-{}.{}").format(
+                    username, snapCount, MEDIATYPES[mediaType]
+                )
 
-        except KeyboardInterrupt:
-            executor.shutdown(wait=False)
+                if self.dumpJSON:
+                    self._dumpSnapJSON(snap, userProfile, os.path.join(dirname, Path(filename).stem + ".json"), "curated highlight")
+
+                pathname = os.path.join(dirname, filename)
+                if self.fast and self._snapExists(pathname, existingFiles):
+                    logSkipped(os.path.basename(pathname))
+                elif self.noMultipart:
+                    downloadFutures.append(executor.submit(self._downloadSnap, mediaURL, pathname))
+                else:
+                    if self._downloadSnap(mediaURL, pathname):
+                        downloadCount += 1
+                total += 1
+
+        downloadCount += self._awaitDownloads(downloadFutures)
+        executor.shutdown()
 
         snapCount = len(curatedHighlights)
         msg = "{} curated highlights containing {} snaps downloaded ({}) or existing ({}) for <magenta>{}</magenta>".format(snapCount, total, downloadCount, total-downloadCount, username)
@@ -512,63 +697,56 @@ class SnapchatDL:
         
         logger.opt(colors=True).info("\n[+] <magenta>{}</magenta> has {} spotlight highlights".format(username, len(spotlightHighlights)))
 
+        categoryFolder = os.path.join(self.rootFolder, username, "Spotlight Highlights")
+
+        offsetHome = datetime.now(self._tzHome).utcoffset()
+
+        downloadFutures = []
+        existingFiles = {}
+        createdFolders = set()
         executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.maxWorkers)
-        try:
-             group = 0
-             downloadCount = 0
-             for highlight in spotlightHighlights:
-                #logger.debug(json.dumps(highlight, indent=4))
-                group += 1
-                snapCount = 0
-                snaps = highlight["snapList"]
-                for snap in snaps:
-                    #logger.debug(json.dumps(snap, indent=4))
-                    #id = snap["snapId"]["value"]
-                    mediaURL = snap["snapUrls"]["mediaUrl"]
-                    if len(mediaURL) == 0:
-                        continue
-                    mediaType = snap["snapMediaType"]
-                    timestampUTC = int(snap["timestampInSec"]["value"])
-
-                    dtUTC = datetime.fromtimestamp(timestampUTC, tz.tzutc())
-                    tzLocal = tz.tzlocal()
-                    tzHome = tz.gettz('America/Detroit')
-                    dtLocal = datetime.now(tzLocal)
-                    dtHome = datetime.now(tzHome)
-                    offsetLocal = dtLocal.utcoffset() / timedelta(hours=1)
-                    offsetHome = dtHome.utcoffset() / timedelta(hours=1)
-                    dtLocal = dtUTC + timedelta(hours=offsetLocal)
-                    dtLocal = dtUTC + timedelta(hours=offsetHome)
-                    if dtLocal.dst() == timedelta(0):
-                        dtLocal = dtLocal + timedelta(hours=1)
-                    timestampHome = dtHome.timestamp()
-                    timestampLocal = dtLocal.timestamp()
-                    dateFolder = strftime(timestampLocal, "%Y-%m-%d")
-
-                    dirname = os.path.join(self.rootFolder, username, "Spotlight Highlights", dateFolder)
+        group = 0
+        downloadCount = 0
+        for highlight in spotlightHighlights:
+            #logger.debug(json.dumps(highlight, indent=4))
+            group += 1
+            snapCount = 0
+            snaps = highlight["snapList"]
+            for snap in snaps:
+                #logger.debug(json.dumps(snap, indent=4))
+                #id = snap["snapId"]["value"]
+                mediaURL = snap["snapUrls"]["mediaUrl"]
+                if len(mediaURL) == 0:
+                    continue
+                mediaType = snap["snapMediaType"]
+                timestampUTC = int(snap["timestampInSec"]["value"])
+
+                timestampLocal, dateFolder = self._toLocalDate(timestampUTC, offsetHome)
+
+                dirname = os.path.join(categoryFolder, dateFolder)
+                if dirname not in createdFolders:
                     os.makedirs(dirname, exist_ok=True)
+                    createdFolders.add(dirname)
 
-                    snapCount += 1
-                    filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}_spotlight.{}").format(
-                        username, MEDIATYPES[mediaType]
-                    )
-
-                    if self.dumpJSON:
-                        filename = os.path.join(dirname, Path(filename).stem + ".json")
-                        mediaJSON = dict(snap)
-                        mediaJSON["snapUser"] = userProfile
-                        logger.opt(colors=True).info("\tDumping spotlight highlight JSON:\n\t\t<blue>{}</blue>".format(os.path.basename(filename)))
-                        dumpResponse(mediaJSON, filename)
-
-                    pathname = os.path.join(dirname, filename)
-                    if self.noMultipart:
-                        executor.submit(DownloadUrl, mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast)
-                    else:
-                        if DownloadUrl(mediaURL, pathname, self.sleepInterval, self.quiet, self.automated, self.fast):
-                            downloadCount += 1
+                snapCount += 1
+                filename = strftime(timestampLocal, "%Y-%m-%d_%H-%M-%S_{}_spotlight.{}").format(
+                    username, MEDIATYPES[mediaType]
+                )
 
-        except KeyboardInterrupt:
-            executor.shutdown(wait=False)
+                if self.dumpJSON:
+                    self._dumpSnapJSON(snap, userProfile, os.path.join(dirname, Path(filename).stem + ".json"), "spotlight highlight")
+
+                pathname = os.path.join(dirname, filename)
+                if self.fast and self._snapExists(pathname, existingFiles):
+                    logSkipped(os.path.basename(pathname))
+                elif self.noMultipart:
+                    downloadFutures.append(executor.submit(self._downloadSnap, mediaURL, pathname))
+                else:
+                    if self._downloadSnap(mediaURL, pathname):
+                        downloadCount += 1
+
+        downloadCount += self._awaitDownloads(downloadFutures)
+        executor.shutdown()
 
         snapCount = len(spotlightHighlights)
         msg = "{} spotlight highlights downloaded ({}) or existing ({}) for <magenta>{}</magenta>".format(snapCount, downloadCount, snapCount-downloadCount, username)
@@ -595,41 +773,48 @@ class SnapchatDL:
         """
     #----------------------------------------------------------------------------------------------------------------------
         logger.opt(colors=True).info("Calling Snapchat API for <magenta>{}</magenta>".format(username))
-        retryCount = 0
-        while retryCount < MAXRETRYCOUNT:
-            retryCount += 1
-            content, userProfile, publicStories, curatedHighlights, spotlightHighlights = self._apiProcessResponse(username)
-            if content == 'nouser':
-                content = []
-                break
-            if content:
+        # HTTP failures are retried by the session's adapter; only pages that came back without a usable payload are
+        # requested again here
+        for retryCount in range(MAXRETRYCOUNT):
+            status, result = self._apiProcessResponse(username)
+            if status != "transient":
                 break
+            # back off exponentially between attempts instead of hammering the API; no wait after the last one
+            if retryCount < MAXRETRYCOUNT - 1:
+                time.sleep(min(30, 2 ** retryCount + random.random()))
+
+        if status == "notfound":
+            return
 
-        if not content:
+        if status != "ok":
             logger.opt(colors=True).error("[x] Unable to process Snapchat API results for <magenta>{}</magenta>\n".format(username))
             return
 
+        content, userProfile, publicStories, curatedHighlights, spotlightHighlights = result
         displayname = self._findDisplayName(userProfile)
         userFolder = os.path.join(self.rootFolder, username)
 
+        # the full payload is always kept; the per-section extracts are subtrees of it and only written on request
         dumpResponse(content, os.path.join(userFolder, username+".json"))
-        dumpResponse(userProfile, os.path.join(userFolder, username+"_user.json"))
+        if self.dumpJSON:
+            dumpResponse(userProfile, os.path.join(userFolder, username+"_user.json"))
 
-        #download user avatar image
-        if "linkPreview" in content["props"]["pageProps"]:
-            linkPreview = content["props"]["pageProps"]["linkPreview"]
+        #download user avatar image (into userFolder, which the profile dump above has created)
+        linkPreview = content["props"]["pageProps"].get("linkPreview")
+        if linkPreview is not None:
             if "facebookImage" in linkPreview:
                 facebookImage = linkPreview["facebookImage"]
                 url = facebookImage["url"]
-                DownloadUrl(url, os.path.join(userFolder, displayname+".jpg"), sleepInterval=0, quiet=self.quiet, automated=self.automated, skipSizeCheck=self.fast)
+                DownloadUrl(url, os.path.join(userFolder, displayname+".jpg"), sleepInterval=0, quiet=self.quiet, automated=self.automated, skipSizeCheck=self.fast, session=self.session)
         if "squareHeroImageUrl" in userProfile:
             url = userProfile["squareHeroImageUrl"]
             if len(url) > 0:
-                DownloadUrl(url, os.path.join(userFolder, displayname+" (Hero).jpg"), sleepInterval=0, quiet=self.quiet, automated=self.automated, skipSizeCheck=self.fast)
+                DownloadUrl(url, os.path.join(userFolder, displayname+" (Hero).jpg"), sleepInterval=0, quiet=self.quiet, automated=self.automated, skipSizeCheck=self.fast, session=self.session)
 
         #download public stories
         if len(publicStories) > 0:
-            dumpResponse(publicStories, os.path.join(userFolder, username+"_stories.json"))
+            if self.dumpJSON:
+                dumpResponse(publicStories, os.path.join(userFolder, username+"_stories.json"))
             if not self.skipStories:
                 self._downloadPublicStories(userProfile, publicStories)
         else:
@@ -637,7 +822,8 @@ class SnapchatDL:
 
         #download curated highlights
         if len(curatedHighlights) > 0:
-            dumpResponse(curatedHighlights, os.path.join(userFolder, username+"_curated.json"))
+            if self.dumpJSON:
+                dumpResponse(curatedHighlights, os.path.join(userFolder, username+"_curated.json"))
             if not self.skipCurated:
                 self._downloadCuratedHighlights(userProfile, curatedHighlights)
         else:
@@ -645,13 +831,75 @@ class SnapchatDL:
 
         #download spotlight highlights
         if len(spotlightHighlights) > 0:
-            dumpResponse(spotlightHighlights, os.path.join(userFolder, username+"_spotlight.json"))
+            if self.dumpJSON:
+                dumpResponse(spotlightHighlights, os.path.join(userFolder, username+"_spotlight.json"))
             if not self.skipSpotlight:
                 self._downloadSpotlightHighlights(userProfile, spotlightHighlights)
         else:
             logger.opt(colors=True).info("\n[∅] <magenta>{}</magenta> has no spotlight highlights".format(username))
 
-        logger.opt(colors=True).info("\n[✔] Completed processing for <magenta>{}</magenta>\n".format(username))
+        logger.opt(colors=True).info("\n[✔] Completed processing for <magenta>{}</magenta>\n", username)
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def _downloadSnapsJittered(self, username:str, sleepInterval:float):
+        """
+        Download Snapchat snaps for `username` after a random delay.
+
+        Args:
+            username (str): Snapchat `username`
+            sleepInterval (float): upper bound of the random delay before starting
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        # jitter the start so parallel workers don't hit Snapchat in synchronized bursts
+        time.sleep(random.uniform(0, sleepInterval))
+        if self._cancelled.is_set():
+            return
+
+        try:
+            self.DownloadSnaps(username)
+        except UserNotFoundError:
+            pass
+
+
+    #----------------------------------------------------------------------------------------------------------------------
+    def DownloadSnapsMany(self, usernames:list, sleepInterval:float=1):
+        """
+        Download Snapchat snaps for several users in parallel, sharing this instance's session.
+
+        Args:
+            usernames (list): Snapchat usernames
+            sleepInterval (float, optional): upper bound of the random delay before each user starts. Defaults to 1.
+
+        Returns:
+            (list): usernames whose download raised an error
+        """
+    #----------------------------------------------------------------------------------------------------------------------
+        if not usernames:
+            return []
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(usernames), self.maxWorkers))
+        futures = {}
+        failed = []
+        try:
+            for username in usernames:
+                futures[executor.submit(self._downloadSnapsJittered, username, sleepInterval)] = username
+
+            for future in concurrent.futures.as_completed(futures):
+                if future.exception() is not None:
+                    logger.opt(colors=True).error("<red>[⏹] Download failed for <magenta>{}</magenta>: {}</red>", futures[future], future.exception())
+                    failed.append(futures[future])
+            executor.shutdown(wait=True)
+        except KeyboardInterrupt:
+            # drop the users that haven't started and let the running ones stop at their next download, so Close()
+            # doesn't pull the session and merge executor out from under them
+            self._cancelled.set()
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            raise
+
+        return failed
 
 
 #======================================================================================================================
@@ -5,11 +5,29 @@
 import json
 import os
 import re
+import string
 
 from argparse   import Namespace
+from contextlib import contextmanager
 from datetime   import datetime
+from datetime   import timezone
 from loguru     import logger       # pyright: ignore[reportMissingImports]
 
+try:
+    import orjson                   # pyright: ignore[reportMissingImports]
+except ImportError:
+    orjson = None
+
+USERNAMECHARS       = frozenset(string.ascii_letters + string.digits + "-._")
+JSONENCODER         = json.JSONEncoder(indent=4)
+URLUSERNAMEREGEX    = re.compile(r"https?://(?:story|www)\.snapchat\.com/(?:[suad]+/|@)([\-\w\.\_]{3,15})", re.ASCII)
+
+# loguru builds a new logger for every opt() call; the color-enabled one is the only variant used here
+_log = logger.opt(colors=True)
+
+# folders atomicOpen has already created (or found) during this run
+_ensuredFolders = set()
+
 #----------------------------------------------------------------------------------------------------------------------
 class UserNotFoundError(Exception):
     """
@@ -32,7 +50,7 @@ def strftime(timestamp:int, format:str):
         str: timestamp formatted to custom format.
     """
 #----------------------------------------------------------------------------------------------------------------------
-    return datetime.utcfromtimestamp(timestamp).strftime(format)
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime(format)
 
 
 #----------------------------------------------------------------------------------------------------------------------
@@ -42,11 +60,10 @@ def strftrunc(s, n):
         # string is already short-enough
         return s
     # half of the size, minus the 3 .'s
-    n_2 = int(n) / 2 - 3
-    n_2 = int(n_2)
+    n_2 = n // 2 - 3
     # whatever's left
     n_1 = n - n_2 - 3
-    return '{0}...{1}'.format(s[:n_1], s[-n_2:])
+    return f"{s[:n_1]}...{s[-n_2:]}"
 
 
 #----------------------------------------------------------------------------------------------------------------------
@@ -61,11 +78,11 @@ def validateUsername(username:str):
         bool: True if username is valid.
     """
 #----------------------------------------------------------------------------------------------------------------------
-    match = re.match(r"(?P<username>^[\-\w\.\_]{3,15}$)", username)
-    if match is None:
+    # most rejects (blank lines, long log lines, stray folder names) fail on length alone
+    if not 3 <= len(username) <= 15:
         return False
 
-    return match and match.groupdict()["username"] == username
+    return USERNAMECHARS.issuperset(username)
 
 
 #----------------------------------------------------------------------------------------------------------------------
@@ -80,53 +97,39 @@ def searchUsernames(usernames: str) -> list:
         list: valid username matches found in usernames
     """
 #----------------------------------------------------------------------------------------------------------------------
-    return list(
-        sorted(
-            set(
-                [
-                    username
-                    for username in re.findall(
-                        r"https?://(?:story|www).snapchat.com/(?:[suad]+/|@)([\-\w\.\_]{3,15})",
-                        usernames,
-                    )
-                    if validateUsername(username)
-                ]
-            )
-        )
-    )
+    # the capture group only matches what validateUsername accepts, so the hits need no further filtering
+    return sorted(set(URLUSERNAMEREGEX.findall(usernames)))
 
 
 #----------------------------------------------------------------------------------------------------------------------
-def processBatchFile(args: Namespace) -> list:
+def processBatchFile(args: Namespace) -> set:
     """
-    Return list of usernames from file args.batchFile.
+    Return set of usernames from file args.batchFile.
 
     Args:
         args (Namespace): argparse Namespace
 
     Returns:
-        list: usernames read from batchFile
+        set: usernames read from batchFile
     """
 #----------------------------------------------------------------------------------------------------------------------
-    usernames = list()
+    usernames = set()
     if args.batchFile is not None:
         if os.path.isfile(args.batchFile) is False:
-            logger.opt(colors=True).error("<red>[⏹] Invalid batch file at <blue>{}</blue></red>\n".format(args.batchFile))
-            return []
+            _log.error("<red>[⏹] Invalid batch file at <blue>{}</blue></red>\n", args.batchFile)
+            return set()
 
-        with open(args.batchFile, "r") as file:
-            for user in file.read().split("\n"):
-                username = user.strip()
-                if validateUsername(username) and username not in usernames:
-                    usernames.append(username)
+        # one streaming pass; the set takes care of duplicates
+        with open(args.batchFile, "r", buffering=1 << 20) as file:
+            usernames = {username for username in map(str.strip, file) if validateUsername(username)}
 
-        logger.opt(colors=True).info("\nAdded {} usernames from <blue>{}</blue>\n".format(len(usernames), args.batchFile))
+        _log.info("\nAdded {} usernames from <blue>{}</blue>\n", len(usernames), args.batchFile)
 
     return usernames
 
 
 #----------------------------------------------------------------------------------------------------------------------
-def processRootFolder(args: Namespace):
+def processRootFolder(args: Namespace) -> set:
     """
     Return dirnames as username from file args.rootFolder.
 
@@ -134,52 +137,89 @@ def processRootFolder(args: Namespace):
         args (Namespace): argparse Namespace
 
     Returns:
-        list: usernames read from root folder
+        set: usernames read from root folder
     """
 #----------------------------------------------------------------------------------------------------------------------
-    usernames = list()
+    usernames = set()
     if args.scanRootFolder:
         if os.path.isdir(args.rootFolder) is False:
-            logger.opt(colors=True).error("<red>[⏹] Root folder does not exist at <blue>{}</blue></red>\n".format(args.rootFolder))
-            return []
+            _log.error("<red>[⏹] Root folder does not exist at <blue>{}</blue></red>\n", args.rootFolder)
+            return set()
+
+        # scandir entries carry the file type from the directory read, so most entries need no extra stat
+        with os.scandir(args.rootFolder) as entries:
+            for entry in entries:
+                if entry.is_dir() and validateUsername(entry.name):
+                    usernames.add(entry.name)
 
-        for folder in os.listdir(args.rootFolder):
-            if os.path.isdir(os.path.join(args.rootFolder, folder)):
-                if folder not in usernames and validateUsername(folder):
-                    usernames.append(folder)
-        
-        logger.opt(colors=True).info("\nAdded {} usernames from <blue>{}</blue>\n".format(len(usernames), args.rootFolder))
+        _log.info("\nAdded {} usernames from <blue>{}</blue>\n", len(usernames), args.rootFolder)
 
-    return list(sorted(set(usernames)))
+    return usernames
 
 
 #----------------------------------------------------------------------------------------------------------------------
-def dumpTextFile(content: str, pathname: str):
+def loadJSON(content: str):
     """
-    Write content to pathname using `tx` mode.
+    Parse JSON text, using orjson when it is installed.
 
     Args:
-        content (str): File content to write.
-        pathname (str): absolute path of file to be written.
+        content (str): JSON text
 
-    This will overwrite the file.
+    Returns:
+        Parsed JSON data
     """
 #----------------------------------------------------------------------------------------------------------------------
-    folder = os.path.dirname(pathname)
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
 
-    os.makedirs(folder, exist_ok=True)
 
-    if os.path.isfile(pathname):
-        os.remove(pathname)
+#----------------------------------------------------------------------------------------------------------------------
+@contextmanager
+def atomicOpen(pathname: str, mode: str = "w"):
+    """
+    Open a temporary file next to pathname that replaces pathname once the block completes.
 
-    with open(pathname, "w+") as file:
-        file.write(content)
+    Args:
+        pathname (str): absolute path of file to be written.
+        mode (str): write mode to open the temporary file with.
+
+    An interrupted write never leaves a truncated file behind; on error the temporary file is removed and pathname is
+    left as it was.
+    """
+#----------------------------------------------------------------------------------------------------------------------
+    folder = os.path.dirname(pathname)
+
+    # makedirs stats every path component even when the folder exists; dumps land in a handful of folders per user.
+    # concurrent callers may both create the same folder, which exist_ok tolerates
+    if folder and folder not in _ensuredFolders:
+        os.makedirs(folder, exist_ok=True)
+        _ensuredFolders.add(folder)
+
+    temporary = f"{pathname}.tmp"
+    # opened outside the try: if the open itself fails there is no temporary file to clean up, and the real error
+    # must not be replaced by the one from removing it
+    try:
+        file = open(temporary, mode)
+    except FileNotFoundError:
+        if not folder:
+            raise
+        # the folder was removed after it was cached (e.g. between passes in update mode); create it again
+        os.makedirs(folder, exist_ok=True)
+        file = open(temporary, mode)
+    try:
+        with file:
+            yield file
+    except BaseException:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, pathname)
 
 
 #----------------------------------------------------------------------------------------------------------------------
 def dumpResponse(content: dict, pathname: str):
     """
-    Save JSON file
+    Save JSON file, using orjson when it is installed.
 
     Args:
         content: JSON data
@@ -189,7 +229,16 @@ def dumpResponse(content: dict, pathname: str):
         None
     """
 #----------------------------------------------------------------------------------------------------------------------
-    dumpTextFile(json.dumps(content, indent=4), pathname)
+    # orjson produces the encoded bytes directly; its only indent option is two spaces
+    if orjson is not None:
+        with atomicOpen(pathname, "wb") as file:
+            file.write(orjson.dumps(content, option=orjson.OPT_INDENT_2))
+        return
+
+    # serialize straight into the file rather than building the whole document as a string first; writelines drains
+    # the encoder's pieces in C and the buffered file coalesces them into large writes
+    with atomicOpen(pathname) as file:
+        file.writelines(JSONENCODER.iterencode(content))
 
 #======================================================================================================================
 #======================================================================================================================
@@ -3,38 +3,78 @@
 import os
 import shutil
 import unittest
+from unittest import mock
 
-from requests.exceptions import HTTPError
+from requests.exceptions import ConnectionError
 
-from snapchat_dl.downloader import download_url
+from snapchat_dl.downloader import DownloadUrl
 
 
 def teardown_module(module):
     shutil.rmtree(".test-data")
 
 
+def stubResponse(content=b"", status=200, error=None):
+    """Build a streamed response serving content, optionally failing after the first chunk."""
+    response = mock.Mock(ok=status < 400, status_code=status, headers={"content-length": str(len(content))}, content=content)
+
+    def iter_content(chunk_size):
+        yield content[:chunk_size]
+        if error is not None:
+            raise error
+        for offset in range(chunk_size, len(content), chunk_size):
+            yield content[offset:offset + chunk_size]
+
+    response.iter_content.side_effect = iter_content
+    return response
+
+
 class Test_downloader(unittest.TestCase):
-    """Tests for `snapchat_dl.downloader.download_url` package."""
+    """Tests for `snapchat_dl.downloader.DownloadUrl` package."""
 
     def setUp(self):
         """Set up test fixtures."""
-        self.test_url = (
-            "https://sample-videos.com/video321/mp4/240/big_buck_bunny_240p_1mb.mp4"
-        )
-        self.test_url404 = "https://google.com/error.html"
+        os.makedirs(".test-data", exist_ok=True)
+        self.test_url = "https://cf-st.sc-cdn.net/d/snap.mp4"
+        self.pathname = ".test-data/test_dl_23.mp4"
+        self.content = b"x" * 200000
+        self.session = mock.Mock()
+        self.session.get.return_value = stubResponse(self.content)
+        self.session.head.return_value = stubResponse(self.content)
+
+    def tearDown(self):
+        for filename in os.listdir(".test-data"):
+            os.remove(os.path.join(".test-data", filename))
 
     def test_download_url(self):
-        """Test snapchat_dl download_url."""
-        download_url(self.test_url, ".test-data/test_dl_23.mp4", sleep_interval=0)
+        """Test snapchat_dl DownloadUrl."""
+        self.assertTrue(DownloadUrl(self.test_url, self.pathname, session=self.session))
+        with open(self.pathname, "rb") as file:
+            self.assertEqual(file.read(), self.content)
+        self.assertEqual(os.listdir(".test-data"), ["test_dl_23.mp4"])
 
     def test_empty_download(self):
-        """Test snapchat_dl download_url."""
-        open(".test-data/test_dl_23.mp4", "w").close()
-        download_url(self.test_url, ".test-data/test_dl_23.mp4", sleep_interval=0)
-
-    def test_download_url_raise(self):
-        """Test snapchat_dl download_url with invalid url."""
-        with self.assertRaises(HTTPError):
-            download_url(
-                self.test_url404, ".test-data/test_dl_23.mp4", sleep_interval=0
-            )
+        """Test an empty leftover file is downloaded again."""
+        open(self.pathname, "w").close()
+        self.assertTrue(DownloadUrl(self.test_url, self.pathname, session=self.session))
+        self.assertEqual(os.path.getsize(self.pathname), len(self.content))
+
+    def test_head_skip(self):
+        """Test an existing file matching the HEAD content-length is skipped without a GET."""
+        with open(self.pathname, "wb") as file:
+            file.write(self.content)
+        self.assertFalse(DownloadUrl(self.test_url, self.pathname, session=self.session))
+        self.session.head.assert_called_once()
+        self.session.get.assert_not_called()
+
+    def test_download_url_error(self):
+        """Test snapchat_dl DownloadUrl with an HTTP error."""
+        self.session.get.return_value = stubResponse(status=404)
+        self.assertFalse(DownloadUrl(self.test_url, self.pathname, session=self.session))
+        self.assertFalse(os.path.exists(self.pathname))
+
+    def test_download_url_interrupted(self):
+        """Test a download failing mid-stream leaves nothing behind."""
+        self.session.get.return_value = stubResponse(self.content, error=ConnectionError("reset"))
+        self.assertFalse(DownloadUrl(self.test_url, self.pathname, session=self.session))
+        self.assertEqual(os.listdir(".test-data"), [])
@@ -1,19 +1,19 @@
 #!/usr/bin/env python
 """Tests for `snapchat_dl` package."""
-import json
-import os
-import shutil
 import unittest
+from datetime import timedelta
 from unittest import mock
 
 from snapchat_dl.snapchat_dl import SnapchatDL
-from snapchat_dl.utils import APIResponseError
-from snapchat_dl.utils import NoStoriesFound
-from snapchat_dl.utils import UserNotFoundError
 
 
-def teardown_module(module):
-    shutil.rmtree(".test-data")
+def story(timestamp, mediaType, mediaURL="https://example.com/snap"):
+    """Build a minimal public story."""
+    return {
+        "snapUrls": {"mediaUrl": mediaURL},
+        "snapMediaType": mediaType,
+        "timestampInSec": {"value": str(timestamp)},
+    }
 
 
 class TestSnapchat_dl(unittest.TestCase):
@@ -21,16 +21,7 @@ class TestSnapchat_dl(unittest.TestCase):
 
     def setUp(self):
         """Set up test fixtures."""
-        self.snapchat_dl = SnapchatDL(
-            limit_story=10,
-            quiet=True,
-            directory_prefix=".test-data",
-            dump_json=True,
-        )
-        self.test_url = (
-            "https://sample-videos.com/video321/mp4/240/big_buck_bunny_240p_1mb.mp4"
-        )
-        self.test_url404 = "https://google.com/error.html"
+        self.snapchat_dl = SnapchatDL(rootFolder=".test-data", quiet=True)
         self.username = "invalidusername"
         self.html = open(
             "tests/mock_data/invalidusername.html", "r", encoding="utf8"
@@ -42,31 +33,71 @@ class TestSnapchat_dl(unittest.TestCase):
             "tests/mock_data/invalidusername-nostories.html", "r", encoding="utf8"
         ).read()
 
+    def tearDown(self):
+        self.snapchat_dl.Close()
+
     def test_class_init(self):
         """Test snapchat_dl init."""
         self.assertTrue(self.snapchat_dl)
 
-    def test_invalid_username(self):
-        """Test snapchat_dl Stories are not available."""
-        with self.assertRaises(UserNotFoundError):
-            self.snapchat_dl.download("use=rname")
-
-    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._api_response")
+    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._apiRequestResponse")
     def test_api_error(self, api_response):
-        """Test snapchat_dl Download."""
-        api_response.return_value = self.html_api_error
-        with self.assertRaises(APIResponseError):
-            self.snapchat_dl.download(self.username)
+        """Test a page without the API payload is retried."""
+        api_response.return_value = (self.html_api_error, 200)
+        status, result = self.snapchat_dl._apiProcessResponse(self.username)
+        self.assertEqual(status, "transient")
+        self.assertIsNone(result)
 
-    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._api_response")
+    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._apiRequestResponse")
     def test_get_stories(self, api_response):
-        """Test snapchat_dl Download."""
-        api_response.return_value = self.html
-        self.snapchat_dl.download(self.username)
+        """Test public stories are parsed from the page."""
+        api_response.return_value = (self.html, 200)
+        status, result = self.snapchat_dl._apiProcessResponse(self.username)
+        self.assertEqual(status, "ok")
+        self.assertEqual(len(result[2]), 4)
 
-    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._api_response")
+    @mock.patch("snapchat_dl.snapchat_dl.SnapchatDL._apiRequestResponse")
     def test_no_stories(self, api_response):
-        """Test snapchat_dl Download."""
-        api_response.return_value = self.html_nostories
-        with self.assertRaises(NoStoriesFound):
-            self.snapchat_dl.download(self.username)
+        """Test a profile without public stories."""
+        api_response.return_value = (self.html_nostories, 200)
+        status, result = self.snapchat_dl._apiProcessResponse(self.username)
+        self.assertEqual(status, "ok")
+        self.assertEqual(len(result[2]), 0)
+
+    def test_api_request_split_tags(self):
+        """Test the payload is found when chunk boundaries split both script tags."""
+        page = self.html.encode("utf8")
+        start = page.index(b'id="__NEXT_DATA__"') + 5
+        end = page.index(b"</script>", start) + 4
+        chunks = [page[:start], page[start:end], page[end:end + 100], page[end + 100:]]
+        response = mock.MagicMock(status_code=200, encoding="utf-8")
+        response.__enter__.return_value = response
+        response.iter_content.return_value = iter(chunks)
+        with mock.patch.object(self.snapchat_dl, "session") as session:
+            session.get.return_value = response
+            text, status = self.snapchat_dl._apiRequestResponse(self.username)
+        self.assertEqual(status, 200)
+        self.assertEqual(text, page[:end + 100].decode("utf8"))
+        self.assertIn("__NEXT_DATA__", text)
+
+    def test_group_video_run(self):
+        """Test consecutive videos sharing a timestamp make up one multipart story."""
+        stories = [story(1000, 1), story(1000, 1), story(1000, 1)]
+        groups = self.snapchat_dl._groupPublicStories(stories, timedelta(0))
+        self.assertEqual(len(groups), 1)
+        self.assertEqual([snap[0] for snap in groups[0][2]], stories)
+
+    def test_group_image_then_video(self):
+        """Test a video continues the image before it when they share a timestamp."""
+        stories = [story(1000, 0), story(1000, 1), story(2000, 1)]
+        groups = self.snapchat_dl._groupPublicStories(stories, timedelta(0))
+        self.assertEqual([len(group[2]) for group in groups], [2, 1])
+        self.assertEqual([snap[2] for snap in groups[0][2]], [0, 1])
+
+    def test_group_single_snaps(self):
+        """Test snaps with different timestamps, images and empty URLs stand alone or are dropped."""
+        stories = [story(1000, 1), story(2000, 1), story(2000, 0), story(3000, 0, mediaURL=""), story(4000, 0)]
+        groups = self.snapchat_dl._groupPublicStories(stories, timedelta(0))
+        self.assertEqual([len(group[2]) for group in groups], [1, 1, 1, 1])
+        self.assertEqual([group[2][0][0] for group in groups], [stories[0], stories[1], stories[2], stories[4]])
+        self.assertTrue(all(group[1] == "1970-01-01" for group in groups))
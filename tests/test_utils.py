@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 """Tests for `snapchat_dl` package."""
+import os
+import shutil
 import unittest
 from argparse import Namespace
 
-from snapchat_dl.utils import search_usernames
-from snapchat_dl.utils import strf_time
-from snapchat_dl.utils import use_batch_file
-from snapchat_dl.utils import use_prefix_dir
-from snapchat_dl.utils import valid_username
+from snapchat_dl.utils import atomicOpen
+from snapchat_dl.utils import processBatchFile
+from snapchat_dl.utils import processRootFolder
+from snapchat_dl.utils import searchUsernames
+from snapchat_dl.utils import strftime
+from snapchat_dl.utils import validateUsername
+from snapchat_dl.utils import URLUSERNAMEREGEX
 
 
 class Test_utils(unittest.TestCase):
@@ -15,12 +19,12 @@ class Test_utils(unittest.TestCase):
 
     def test_valid_username(self):
         """Test for invalid username."""
-        self.assertFalse(valid_username("2323 2323"))
+        self.assertFalse(validateUsername("2323 2323"))
 
-    def test_strf_time(self):
-        """Test strf_time."""
+    def test_strftime(self):
+        """Test strftime."""
         self.assertEqual(
-            strf_time(978307200, "%Y-%m-%dT%H-%M-%S"),
+            strftime(978307200, "%Y-%m-%dT%H-%M-%S"),
             "2001-01-01T00-00-00",
         )
 
@@ -34,19 +38,49 @@ class Test_utils(unittest.TestCase):
             https://story.snapchat.com/@user_name
         """
         usernames = ["user.name2", "user_name", "username1"]
-        self.assertListEqual(search_usernames(string), usernames)
-
-    def test_use_batch_file(self):
-        args = Namespace(batch_file="tests/mock_data/batch_file.txt")
-        usernames = ["username1", "user.name2", "user_name"]
-        self.assertListEqual(use_batch_file(args), usernames)
-
-    def test_use_batch_file_err(self):
-        args = Namespace(batch_file="tests/mock_data/batch_file_err.txt")
-        with self.assertRaises(Exception):
-            use_batch_file(args)
-
-    def test_use_prefix_dir(self):
-        args = Namespace(scan_prefix=True, save_prefix="tests/mock_data", quiet=False)
-        usernames = ["user.1name", "user1"]
-        self.assertListEqual(use_prefix_dir(args), usernames)
+        self.assertListEqual(searchUsernames(string), usernames)
+
+    def test_search_usernames_valid(self):
+        """Test every username captured from a URL passes validation."""
+        string = """
+            https://story.snapchat.com/s/username1
+            https://www.snapchat.com/add/user.name2
+            https://story.snapchat.com/@user_name-with-too-many-characters
+            https://story.snapchat.com/s/usérname
+            https://story.snapchat.com/s/a
+        """
+        usernames = URLUSERNAMEREGEX.findall(string)
+        self.assertTrue(usernames)
+        for username in usernames:
+            self.assertTrue(validateUsername(username), username)
+
+    def test_process_batch_file(self):
+        args = Namespace(batchFile="tests/mock_data/batch_file.txt")
+        usernames = {"username1", "user.name2", "user_name"}
+        self.assertSetEqual(processBatchFile(args), usernames)
+
+    def test_process_batch_file_err(self):
+        args = Namespace(batchFile="tests/mock_data/batch_file_err.txt")
+        self.assertSetEqual(processBatchFile(args), set())
+
+    def test_process_root_folder(self):
+        args = Namespace(scanRootFolder=True, rootFolder="tests/mock_data")
+        usernames = {"user.1name", "user1"}
+        self.assertSetEqual(processRootFolder(args), usernames)
+
+    def test_atomic_open_cleanup(self):
+        """Test an error inside atomicOpen keeps the original file and removes the temporary one."""
+        pathname = ".test-data/atomic.json"
+        os.makedirs(".test-data", exist_ok=True)
+        self.addCleanup(shutil.rmtree, ".test-data", ignore_errors=True)
+        with open(pathname, "w") as file:
+            file.write("original")
+
+        with self.assertRaises(RuntimeError):
+            with atomicOpen(pathname) as file:
+                file.write("partial")
+                raise RuntimeError
+
+        with open(pathname) as file:
+            self.assertEqual(file.read(), "original")
+        self.assertEqual(os.listdir(".test-data"), ["atomic.json"])